@@ -2,8 +2,10 @@ from flask import Flask, request, jsonify
 import os
 import shutil
 from typing import List, Any
-from multimodal_search.chroma_db import get_multi_vector_retriever
-from multimodal_search.utils import save_images_from_results, print_retriever_contents
+from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from multimodal_search.cache import SearchResultCache
+from multimodal_search.retriever_manager import RetrieverManager
+from multimodal_search.utils import encode_result_images, write_result_images, print_retriever_contents
 import io
 from contextlib import redirect_stdout
 
@@ -12,6 +14,42 @@ app = Flask(__name__)
 # Ensure outputs directory exists
 os.makedirs("outputs", exist_ok=True)
 
+# Search result cache, configured through environment variables:
+# - SEARCH_CACHE_SIZE: number of queries kept in memory
+# - SEARCH_CACHE_MAX_BYTES: memory used by cached result images, the limit that
+#   usually applies first since every entry holds the JPEG bytes of its results
+# - SEARCH_CACHE_DIR: optional directory shared by server processes
+# - SEARCH_CACHE_DISK_MAX_BYTES: maximum size of the shared directory
+# - SEARCH_CACHE_SIMILARITY_THRESHOLD: optional cosine similarity above which
+#   results are reused for near-identical queries
+similarity_threshold = os.environ.get("SEARCH_CACHE_SIMILARITY_THRESHOLD")
+search_cache = SearchResultCache(
+    max_entries=int(os.environ.get("SEARCH_CACHE_SIZE", "256")),
+    max_bytes=int(os.environ.get("SEARCH_CACHE_MAX_BYTES", str(64 << 20))),
+    cache_dir=os.environ.get("SEARCH_CACHE_DIR"),
+    max_disk_bytes=int(os.environ.get("SEARCH_CACHE_DISK_MAX_BYTES", str(1 << 30))),
+    similarity_threshold=float(similarity_threshold) if similarity_threshold else None,
+    embedding_function=(
+        GoogleGenerativeAIEmbeddings(model="models/text-embedding-004") if similarity_threshold else None
+    ),
+)
+
+# Loaded retrievers, hot-swapped when a new snapshot is published:
+# - SNAPSHOT_POLL_INTERVAL: seconds between checks for new snapshots
+# - SNAPSHOT_RETENTION: number of most recent snapshots kept per collection
+# - SNAPSHOT_GC_GRACE: seconds a superseded snapshot is kept for other server processes
+def prune_search_cache(collection_name, previous_version, snapshot_id):
+    """Drop cached results of versions this process no longer serves."""
+    search_cache.prune_versions(collection_name, keep_versions=[snapshot_id])
+
+
+retriever_manager = RetrieverManager(
+    poll_interval=float(os.environ.get("SNAPSHOT_POLL_INTERVAL", "5")),
+    keep=int(os.environ.get("SNAPSHOT_RETENTION", "3")),
+    gc_grace_seconds=float(os.environ.get("SNAPSHOT_GC_GRACE", "600")),
+    on_swap=prune_search_cache,
+)
+
 @app.route('/search', methods=['POST'])
 def search():
     """
@@ -45,24 +83,37 @@ def search():
     output_buffer = io.StringIO()
     with redirect_stdout(output_buffer):
         try:
-            # Get retriever_multi_vector_img
-            retriever_multi_vector_img = get_multi_vector_retriever(
-                gallery_path=gallery_path,
-                collection_name=collection_name
-            )
+            # Serve from the cache when the collection has not changed since the query was last run
+            collection_version = retriever_manager.current_version(collection_name)
+            images = None
+            if collection_version is not None:
+                images = search_cache.get(query, collection_name, collection_version)
+
+            if images is not None:
+                print("Serving cached search results.")
+            else:
+                # Lease the retriever so a snapshot swap does not affect this request
+                with retriever_manager.acquire(collection_name, gallery_path) as (
+                    collection_version, retriever_multi_vector_img
+                ):
+                    # Show information
+                    print_retriever_contents(retriever_multi_vector_img)
+
+                    # Perform search
+                    results = retriever_multi_vector_img.get_relevant_documents(query)
 
-            # Show information
-            print_retriever_contents(retriever_multi_vector_img)
+                images = encode_result_images(results)
 
-            # Perform search
-            results = retriever_multi_vector_img.get_relevant_documents(query)
+                # Results from a snapshot that was swapped out mid-request are not worth caching
+                if collection_version is not None and collection_version == retriever_manager.current_version(collection_name):
+                    search_cache.put(query, collection_name, collection_version, images)
 
             # Save results
             output_dir = os.path.join(os.getcwd(), "outputs")
             if os.path.exists(output_dir):
                 shutil.rmtree(output_dir)
                 os.makedirs(output_dir, exist_ok=True)
-            save_images_from_results(results)
+            write_result_images(images)
 
             # Get list of saved image files
             image_files = []
@@ -78,7 +129,7 @@ def search():
                 "status": "success",
                 "message": "Search completed successfully",
                 "output": output_buffer.getvalue(),
-                "result_count": len(results),
+                "result_count": len(images),
                 "image_files": image_files
             })
 
@@ -90,5 +141,16 @@ def search():
                 "output": output_buffer.getvalue()
             }), 500
 
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """
+    Flask route reporting search result cache metrics
+
+    Returns:
+        JSON response with hit/miss counters and the hit rate
+    """
+    return jsonify(search_cache.stats())
+
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5001)
@@ -0,0 +1,331 @@
+import base64
+import hashlib
+import json
+import math
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+
+class SearchResultCache:
+    """
+    Cache of search results keyed by normalized query, search parameters and
+    collection version.
+
+    Entries live in an in-process LRU and, optionally, in a shared on-disk tier
+    that several server processes can read and write. Because the collection
+    version is part of every key, re-indexing a collection makes its old entries
+    unreachable and they age out of the LRU. Versions are never compared, since
+    processes sharing the disk tier may briefly serve different versions.
+
+    When a similarity threshold and an embedding function are given, a query
+    that misses the exact key can reuse the results of a cached query whose
+    embedding has a cosine similarity at or above the threshold.
+
+    The disk tier is capped at `max_disk_bytes`; the least recently used entries
+    are deleted first. Entries of versions that are no longer served are removed
+    with prune_versions.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        max_bytes: int = 64 << 20,
+        cache_dir: Optional[str] = None,
+        similarity_threshold: Optional[float] = None,
+        embedding_function: Optional[Any] = None,
+        max_disk_bytes: int = 1 << 30,
+    ):
+        """
+        Parameters:
+        - max_entries: Maximum number of entries kept in memory
+        - max_bytes: Maximum total size of the results kept in memory
+        - cache_dir: Optional directory for the shared on-disk tier
+        - similarity_threshold: Optional cosine similarity above which a cached
+                                result is reused for a different query
+        - embedding_function: Object with an `embed_query` method, required when
+                              similarity_threshold is set
+        - max_disk_bytes: Maximum total size of the on-disk tier
+        """
+        if similarity_threshold is not None and embedding_function is None:
+            raise ValueError("embedding_function must be provided to use similarity_threshold")
+
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.similarity_threshold = similarity_threshold
+        self.embedding_function = embedding_function
+        self.max_disk_bytes = max_disk_bytes
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._query_embeddings = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "similarity_hits": 0, "misses": 0}
+
+        if self.cache_dir is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Lowercase the query and collapse whitespace."""
+        return " ".join(query.lower().split())
+
+    @staticmethod
+    def _scope(collection_name: str, collection_version: str, search_params: Dict[str, Any]) -> str:
+        """Identify the collection version and search parameters an entry belongs to."""
+        return json.dumps(
+            {"collection_name": collection_name, "collection_version": collection_version, "params": search_params},
+            sort_keys=True,
+            default=str,
+        )
+
+    def make_key(self, query: str, collection_name: str, collection_version: str, **search_params) -> str:
+        """Build the cache key for a query."""
+        scope = self._scope(collection_name, collection_version, search_params)
+        raw = json.dumps([self.normalize_query(query), scope])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, query: str, collection_name: str, collection_version: str, **search_params) -> Optional[List[Any]]:
+        """
+        Look up cached results for a query.
+
+        Returns:
+        - The cached results, or None on a miss
+        """
+        key = self.make_key(query, collection_name, collection_version, **search_params)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._record_hit("memory_hits")
+                return entry["results"]
+
+        entry = self._read_disk(collection_name, collection_version, key)
+        if entry is not None:
+            with self._lock:
+                self._store(key, entry)
+                self._record_hit("disk_hits")
+            return entry["results"]
+
+        if self.similarity_threshold is not None:
+            scope = self._scope(collection_name, collection_version, search_params)
+            embedding = self._embed(query)
+            with self._lock:
+                match_key = self._find_similar(scope, embedding)
+                if match_key is not None:
+                    self._entries.move_to_end(match_key)
+                    self._record_hit("similarity_hits")
+                    return self._entries[match_key]["results"]
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def put(self, query: str, collection_name: str, collection_version: str, results: List[Any], **search_params) -> None:
+        """Store the results of a query."""
+        key = self.make_key(query, collection_name, collection_version, **search_params)
+        entry = {
+            "scope": self._scope(collection_name, collection_version, search_params),
+            "results": results,
+            "embedding": self._embed(query) if self.similarity_threshold is not None else None,
+        }
+
+        with self._lock:
+            self._store(key, entry)
+
+        self._write_disk(collection_name, collection_version, key, entry)
+
+    def invalidate(self, collection_name: Optional[str] = None) -> None:
+        """Drop cached entries for one collection, or for all collections."""
+        with self._lock:
+            if collection_name is None:
+                self._entries.clear()
+                self._bytes = 0
+            else:
+                self._drop_collection(collection_name)
+
+        if self.cache_dir is not None:
+            target = self.cache_dir if collection_name is None else os.path.join(self.cache_dir, collection_name)
+            shutil.rmtree(target, ignore_errors=True)
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def prune_versions(self, collection_name: str, keep_versions: Iterable[str]) -> None:
+        """Drop cached entries of a collection whose version is not in `keep_versions`."""
+        keep_versions = set(keep_versions)
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if _is_stale(e["scope"], collection_name, keep_versions)]:
+                self._remove(key)
+
+        if self.cache_dir is None:
+            return
+        collection_dir = os.path.join(self.cache_dir, collection_name)
+        if not os.path.isdir(collection_dir):
+            return
+        for version in os.listdir(collection_dir):
+            if version not in keep_versions:
+                shutil.rmtree(os.path.join(collection_dir, version), ignore_errors=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the hit rate."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def _record_hit(self, kind: str) -> None:
+        self._stats["hits"] += 1
+        self._stats[kind] += 1
+
+    def _store(self, key: str, entry: Dict[str, Any]) -> None:
+        if key in self._entries:
+            self._remove(key)
+        entry["size"] = _results_size(entry["results"])
+        self._entries[key] = entry
+        self._bytes += entry["size"]
+        while len(self._entries) > self.max_entries or (self._bytes > self.max_bytes and len(self._entries) > 1):
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str) -> None:
+        self._bytes -= self._entries.pop(key)["size"]
+
+    def _drop_collection(self, collection_name: str) -> None:
+        for key in [k for k, e in self._entries.items() if json.loads(e["scope"])["collection_name"] == collection_name]:
+            self._remove(key)
+
+    def _embed(self, query: str) -> List[float]:
+        normalized = self.normalize_query(query)
+        with self._lock:
+            embedding = self._query_embeddings.get(normalized)
+            if embedding is not None:
+                self._query_embeddings.move_to_end(normalized)
+                return embedding
+
+        embedding = self.embedding_function.embed_query(normalized)
+
+        with self._lock:
+            self._query_embeddings[normalized] = embedding
+            while len(self._query_embeddings) > self.max_entries:
+                self._query_embeddings.popitem(last=False)
+        return embedding
+
+    def _find_similar(self, scope: str, embedding: List[float]) -> Optional[str]:
+        best_key, best_score = None, self.similarity_threshold
+        for key, entry in self._entries.items():
+            if entry["scope"] != scope or entry["embedding"] is None:
+                continue
+            score = _cosine_similarity(embedding, entry["embedding"])
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key
+
+    def _disk_path(self, collection_name: str, collection_version: str, key: str) -> str:
+        return os.path.join(self.cache_dir, collection_name, collection_version, f"{key}.json")
+
+    def _read_disk(self, collection_name: str, collection_version: str, key: str) -> Optional[Dict[str, Any]]:
+        if self.cache_dir is None:
+            return None
+        path = self._disk_path(collection_name, collection_version, key)
+        try:
+            with open(path, 'r') as f:
+                entry = _decode_entry(json.load(f))
+            # Refresh the modification time, which orders entries for eviction
+            os.utime(path)
+            return entry
+        except Exception:
+            # Unreadable or corrupted entries are treated as misses
+            return None
+
+    def _write_disk(self, collection_name: str, collection_version: str, key: str, entry: Dict[str, Any]) -> None:
+        if self.cache_dir is None:
+            return
+        path = self._disk_path(collection_name, collection_version, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temporary file first so other processes never read a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(_encode_entry(entry), f)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError):
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        self._enforce_disk_limit()
+
+    def _enforce_disk_limit(self) -> None:
+        """Delete the least recently used disk entries until the tier fits in max_disk_bytes."""
+        files = []
+        for dirpath, _, filenames in os.walk(self.cache_dir):
+            for filename in filenames:
+                if not filename.endswith(".json"):
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    # Removed by another process in the meantime
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+
+def _encode_entry(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert an entry to JSON. Results must be bytes or strings; bytes are base64 encoded."""
+    results = []
+    for result in entry["results"]:
+        if isinstance(result, bytes):
+            results.append({"bytes": base64.b64encode(result).decode("ascii")})
+        elif isinstance(result, str):
+            results.append({"str": result})
+        else:
+            raise TypeError(f"Cannot store result of type {type(result).__name__} on disk")
+    return {"scope": entry["scope"], "results": results, "embedding": entry["embedding"]}
+
+
+def _decode_entry(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert an entry read from JSON back to its in-memory form."""
+    results = [
+        base64.b64decode(result["bytes"], validate=True) if "bytes" in result else str(result["str"])
+        for result in data["results"]
+    ]
+    embedding = data.get("embedding")
+    if embedding is not None:
+        embedding = [float(x) for x in embedding]
+    return {"scope": str(data["scope"]), "results": results, "embedding": embedding}
+
+
+def _results_size(results: List[Any]) -> int:
+    """Approximate memory held by a list of results."""
+    return sum(len(result) if isinstance(result, (bytes, str)) else 0 for result in results)
+
+
+def _is_stale(scope: str, collection_name: str, keep_versions: Iterable[str]) -> bool:
+    """Whether an entry scope belongs to a collection version outside `keep_versions`."""
+    scope = json.loads(scope)
+    return scope["collection_name"] == collection_name and scope["collection_version"] not in keep_versions
+
+
+def _cosine_similarity(a: List[float], b: List[float]) -> float:
+    """Cosine similarity between two vectors."""
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
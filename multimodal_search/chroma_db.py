@@ -1,7 +1,9 @@
 import pickle
 import os
 import json
+import shutil
 import uuid
+import warnings
 from typing import Dict, List, Any, Optional, Union, Type
 from langchain.retrievers.multi_vector import MultiVectorRetriever
 from langchain.storage import InMemoryStore
@@ -9,12 +11,24 @@ from langchain_chroma import Chroma
 from langchain_core.documents import Document
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from multimodal_search.image_data_extractor import extract_image_data_for_retrieval
+from multimodal_search.snapshots import (
+    atomic_write,
+    create_staging_dir,
+    finalize_snapshot,
+    get_collection_dir,
+    get_snapshot_dir,
+    get_snapshots_dir,
+    new_snapshot_id,
+    publish_snapshot,
+    read_current_snapshot,
+    validate_snapshot,
+)
 
 
 def get_multi_vector_retriever(gallery_path, collection_name):
     """
-    Retrieves a multi-vector retriever, either by loading an existing Chroma database
-    or by creating a new one.
+    Retrieves a multi-vector retriever, either by loading the current snapshot of the
+    collection or by building and publishing a new one.
 
     Args:
         gallery_path (str): Path to the image gallery.
@@ -23,47 +37,55 @@ def get_multi_vector_retriever(gallery_path, collection_name):
     Returns:
         langchain.retrievers.MultiVectorRetriever: The multi-vector retriever.
     """
-    chroma_db_dirpath = os.path.join(os.getcwd(), "chroma_db")
-    if not os.path.exists(chroma_db_dirpath):
-        os.makedirs(chroma_db_dirpath, exist_ok=True)
-
     # Path to save/load the retriever
-    retriever_save_path = os.path.join(chroma_db_dirpath, collection_name)
+    retriever_save_path = get_retriever_save_path(collection_name)
 
-    # Create embedding function
-    embeddings = GoogleGenerativeAIEmbeddings(model="models/text-embedding-004")
+    # Check if a published snapshot exists
+    snapshot_id = read_current_snapshot(collection_name)
+    if snapshot_id is not None:
+        print(f"MultiVectorRetriever '{collection_name}' found at snapshot: {snapshot_id}")
+        print("Loading...")
+        retriever_multi_vector_img = load_snapshot_retriever(collection_name, snapshot_id)
+        print("MultiVectorRetriever loaded successfully.")
+        return retriever_multi_vector_img
 
-    # Check if a saved retriever exists
-    if os.path.exists(retriever_save_path) and os.path.exists(os.path.join(retriever_save_path, "config.json")):
+    # Retrievers saved before snapshots were introduced live directly in the collection directory
+    if os.path.exists(os.path.join(retriever_save_path, "config.json")):
         print(f"MultiVectorRetriever '{collection_name}' found at: {retriever_save_path}")
         print("Loading...")
 
-        # Define a function to load Chroma
-        def load_chroma(collection_name, persist_directory, embedding_function):
-            return Chroma(
-                collection_name=collection_name,
-                embedding_function=embedding_function,
-                persist_directory=persist_directory
-            )
-
         # Load the retriever
-        retriever_multi_vector_img = load_multi_vector_retriever(
-            retriever_save_path,
-            vectorstore_load_func=load_chroma,
-            vectorstore_load_kwargs={
-                "collection_name": collection_name,
-                "persist_directory": retriever_save_path,
-                "embedding_function": embeddings,
-            }
-        )
-
+        retriever_multi_vector_img = load_flat_layout_retriever(collection_name)
         print("MultiVectorRetriever loaded successfully.")
         return retriever_multi_vector_img
 
-    else:
-        print(f"MultiVectorRetriever '{collection_name}' not found at: {retriever_save_path}.")
-        print("Generating new retriever...")
+    print(f"MultiVectorRetriever '{collection_name}' not found at: {retriever_save_path}.")
+    print("Generating new retriever...")
+    _, retriever_multi_vector_img = build_multi_vector_retriever_snapshot(gallery_path, collection_name)
+    return retriever_multi_vector_img
+
+
+def build_multi_vector_retriever_snapshot(gallery_path, collection_name):
+    """
+    Builds a new immutable snapshot of a collection and publishes it. The snapshot is
+    written to a staging directory, fsynced, renamed into place and only then made
+    current by atomically replacing the collection pointer, so readers never see a
+    partially written index. Old snapshots are left in place: only the server knows
+    which ones are still being queried, so it garbage collects them.
+
+    Args:
+        gallery_path (str): Path to the image gallery.
+        collection_name (str): Name of the Chroma collection.
+
+    Returns:
+        Tuple[str, langchain.retrievers.MultiVectorRetriever]: The new snapshot id and
+        a retriever loaded from the published snapshot.
+    """
+    os.makedirs(get_snapshots_dir(collection_name), exist_ok=True)
+    snapshot_id = new_snapshot_id()
+    staging_dir = create_staging_dir(collection_name, snapshot_id)
 
+    try:
         # Generate image summaries
         print("Start extracting information from images...")
         img_base64_list, image_summaries, image_texts = extract_image_data_for_retrieval(gallery_path)
@@ -71,11 +93,10 @@ def get_multi_vector_retriever(gallery_path, collection_name):
 
         # Create the vectorstore to use for indexing
         print("Creating vectorstore...")
-        persist_directory = os.path.join(chroma_db_dirpath, collection_name)
-        vectorstore = Chroma(
+        vectorstore = _load_chroma(
             collection_name=collection_name,
-            embedding_function=embeddings,
-            persist_directory=persist_directory
+            persist_directory=staging_dir,
+            embedding_function=_get_embeddings(),
         )
 
         # Create retriever
@@ -89,15 +110,193 @@ def get_multi_vector_retriever(gallery_path, collection_name):
         print("Multi-vector retriever created successfully.")
 
         # Save the retriever
-        print(f"Saving retriever to {retriever_save_path}...")
+        print(f"Saving retriever to {staging_dir}...")
         save_multi_vector_retriever(
             retriever_multi_vector_img,
-            retriever_save_path,
+            staging_dir,
             vectorstore_save_method="persist"  # For Chroma, use "persist"
         )
-        print("Retriever saved successfully.")
 
-        return retriever_multi_vector_img
+        # Close the build's Chroma client so its files stop changing before they are sealed
+        release_multi_vector_retriever(retriever_multi_vector_img)
+        finalize_snapshot(collection_name, snapshot_id, staging_dir)
+    except BaseException:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+
+    publish_snapshot(collection_name, snapshot_id)
+    print(f"Snapshot {snapshot_id} published for '{collection_name}'.")
+
+    # Reload from the published location, the build's Chroma client was closed before sealing
+    return snapshot_id, load_snapshot_retriever(collection_name, snapshot_id)
+
+
+def load_snapshot_retriever(collection_name, snapshot_id):
+    """
+    Loads the retriever stored in a snapshot after validating it.
+
+    Args:
+        collection_name (str): Name of the Chroma collection.
+        snapshot_id (str): Id of the snapshot to load.
+
+    Returns:
+        langchain.retrievers.MultiVectorRetriever: The multi-vector retriever.
+    """
+    snapshot_dir = get_snapshot_dir(collection_name, snapshot_id)
+    validate_snapshot(snapshot_dir)
+
+    return load_multi_vector_retriever(
+        snapshot_dir,
+        vectorstore_load_func=_load_chroma,
+        vectorstore_load_kwargs={
+            "collection_name": collection_name,
+            "persist_directory": snapshot_dir,
+            "embedding_function": _get_embeddings(),
+        }
+    )
+
+
+def load_flat_layout_retriever(collection_name):
+    """
+    Loads a retriever saved before snapshots were introduced, which lives directly
+    in the collection directory.
+
+    Args:
+        collection_name (str): Name of the Chroma collection.
+
+    Returns:
+        langchain.retrievers.MultiVectorRetriever: The multi-vector retriever.
+    """
+    retriever_save_path = get_retriever_save_path(collection_name)
+    return load_multi_vector_retriever(
+        retriever_save_path,
+        vectorstore_load_func=_load_chroma,
+        vectorstore_load_kwargs={
+            "collection_name": collection_name,
+            "persist_directory": retriever_save_path,
+            "embedding_function": _get_embeddings(),
+        }
+    )
+
+
+def get_retriever_save_path(collection_name):
+    """
+    Returns the directory where the retriever of a collection is saved.
+
+    Args:
+        collection_name (str): Name of the Chroma collection.
+
+    Returns:
+        str: Path to the retriever directory.
+    """
+    return get_collection_dir(collection_name)
+
+
+def get_collection_version(collection_name):
+    """
+    Returns the version stamp of a saved collection. The stamp changes every time
+    the retriever is rebuilt, so it can be used to invalidate derived data such as
+    cached search results.
+
+    Args:
+        collection_name (str): Name of the Chroma collection.
+
+    Returns:
+        Optional[str]: The version stamp, or None if the collection has not been saved.
+    """
+    snapshot_id = read_current_snapshot(collection_name)
+    if snapshot_id is not None:
+        return snapshot_id
+    return get_flat_layout_version(collection_name)
+
+
+def get_flat_layout_version(collection_name):
+    """
+    Returns the version stamp of a retriever saved before snapshots were introduced,
+    ignoring any published snapshot.
+
+    Args:
+        collection_name (str): Name of the Chroma collection.
+
+    Returns:
+        Optional[str]: The config modification time, or None if there is no such retriever.
+    """
+    config_path = os.path.join(get_retriever_save_path(collection_name), "config.json")
+    try:
+        return str(os.stat(config_path).st_mtime_ns)
+    except OSError:
+        return None
+
+
+def warm_up_retriever(retriever):
+    """
+    Runs a query against a retriever's vectorstore so chromadb loads its vector index
+    before the retriever serves traffic. The query reuses a stored embedding, so no
+    embedding API call is made.
+
+    Args:
+        retriever (langchain.retrievers.MultiVectorRetriever): The retriever to warm up.
+    """
+    vectorstore = retriever.vectorstore
+    stored = vectorstore.get(limit=1, include=["embeddings"])
+    embeddings = stored.get("embeddings")
+    if embeddings is None or len(embeddings) == 0:
+        return
+    vectorstore.similarity_search_by_vector([float(x) for x in embeddings[0]], k=1)
+
+
+def release_multi_vector_retriever(retriever):
+    """
+    Releases the resources held by a retriever's vectorstore. chromadb keeps one
+    system per persist directory alive for the whole process, holding an open SQLite
+    connection and the in-memory index, so it has to be stopped and evicted
+    explicitly once the retriever is no longer used.
+
+    Args:
+        retriever (langchain.retrievers.MultiVectorRetriever): The retriever to release.
+    """
+    _close_chroma(retriever.vectorstore)
+
+
+def _close_chroma(vectorstore):
+    """
+    Stop the chromadb system behind a Chroma vectorstore and drop it from chromadb's cache.
+    This relies on chromadb internals, so a warning is emitted whenever they cannot be
+    found instead of silently leaking the open database.
+    """
+    client = getattr(vectorstore, "_client", None)
+    if client is None:
+        warnings.warn(f"Cannot release {type(vectorstore).__name__}: it has no chromadb client")
+        return
+
+    system = getattr(client, "_system", None)
+    if system is None:
+        warnings.warn(f"Cannot stop chromadb client {type(client).__name__}: it has no system")
+    else:
+        system.stop()
+
+    # The cache lives on chromadb's SharedSystemClient, whose module differs between versions
+    identifier = getattr(client, "_identifier", None)
+    for cls in type(client).__mro__:
+        cache = vars(cls).get("_identifier_to_system")
+        if cache is not None and identifier is not None:
+            cache.pop(identifier, None)
+            return
+    warnings.warn(f"Cannot evict chromadb client {type(client).__name__} from chromadb's system cache")
+
+
+def _get_embeddings():
+    """Create the embedding function used to index and query collections."""
+    return GoogleGenerativeAIEmbeddings(model="models/text-embedding-004")
+
+
+def _load_chroma(collection_name, persist_directory, embedding_function):
+    """Open a persistent Chroma collection."""
+    return Chroma(
+        collection_name=collection_name,
+        embedding_function=embedding_function,
+        persist_directory=persist_directory
+    )
 
 
 def create_multi_vector_retriever(
@@ -184,8 +383,7 @@ def save_multi_vector_retriever(
     all_docs = retriever.docstore.mget(all_keys)
     docstore_data = dict(zip(all_keys, all_docs))
 
-    with open(docstore_path, 'wb') as f:
-        pickle.dump(docstore_data, f)
+    atomic_write(docstore_path, pickle.dumps(docstore_data))
 
     saved_paths['docstore'] = docstore_path
 
@@ -206,8 +404,7 @@ def save_multi_vector_retriever(
                     "persist_directory": retriever.vectorstore._persist_directory
                 }
                 collection_info_path = os.path.join(save_dir, "vectorstore_info.json")
-                with open(collection_info_path, 'w') as f:
-                    json.dump(collection_info, f)
+                atomic_write(collection_info_path, json.dumps(collection_info).encode("utf-8"))
                 saved_paths['vectorstore_info'] = collection_info_path
 
             # Call persist method
@@ -227,8 +424,7 @@ def save_multi_vector_retriever(
     }
 
     config_path = os.path.join(save_dir, "config.json")
-    with open(config_path, 'w') as f:
-        json.dump(config, f)
+    atomic_write(config_path, json.dumps(config).encode("utf-8"))
 
     saved_paths['config'] = config_path
 
@@ -279,8 +475,9 @@ def load_multi_vector_retriever(
         with open(vectorstore_info_path, 'r') as f:
             vectorstore_info = json.load(f)
 
-        # Update kwargs with Chroma-specific info
-        vectorstore_load_kwargs.update(vectorstore_info)
+        # Fill in Chroma-specific info; explicitly passed kwargs take precedence since
+        # the recorded persist_directory is stale once a snapshot has been moved into place
+        vectorstore_load_kwargs = {**vectorstore_info, **vectorstore_load_kwargs}
 
     # Load the vectorstore
     vectorstore = vectorstore_load_func(**vectorstore_load_kwargs)
@@ -5,7 +5,7 @@ from langchain_chroma import Chroma
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 
 from image_data_extractor import extract_image_data_for_retrieval
-from chroma_db import get_multi_vector_retriever, create_multi_vector_retriever, save_multi_vector_retriever, load_multi_vector_retriever
+from chroma_db import get_multi_vector_retriever, build_multi_vector_retriever_snapshot, create_multi_vector_retriever, save_multi_vector_retriever, load_multi_vector_retriever
 from utils import save_images_from_results, display_multi_vector_retriever_df, print_retriever_contents
 
 
@@ -14,11 +14,16 @@ def main():
     parser.add_argument("--gallery_path", type=str,  default="images", help="Path to the image or directory of images")
     parser.add_argument("--collection_name", type=str,  default="default_collection", help="Chroma collection name for indexing")
     parser.add_argument("--query", type=str, required=True, help="Search query")
+    parser.add_argument("--rebuild", action="store_true", help="Build and publish a new snapshot of the collection")
     args = parser.parse_args()
 
     # Get retriever_multi_vector_img
-    retriever_multi_vector_img = get_multi_vector_retriever(gallery_path=args.gallery_path,
-                                                            collection_name=args.collection_name)
+    if args.rebuild:
+        _, retriever_multi_vector_img = build_multi_vector_retriever_snapshot(gallery_path=args.gallery_path,
+                                                                              collection_name=args.collection_name)
+    else:
+        retriever_multi_vector_img = get_multi_vector_retriever(gallery_path=args.gallery_path,
+                                                                collection_name=args.collection_name)
 
     # show information
     print_retriever_contents(retriever_multi_vector_img)
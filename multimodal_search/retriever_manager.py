@@ -0,0 +1,202 @@
+import sys
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from multimodal_search.chroma_db import (
+    build_multi_vector_retriever_snapshot,
+    get_flat_layout_version,
+    load_flat_layout_retriever,
+    load_snapshot_retriever,
+    release_multi_vector_retriever,
+    warm_up_retriever,
+)
+from multimodal_search.snapshots import garbage_collect_snapshots, read_current_snapshot
+
+
+class RetrieverManager:
+    """
+    Keeps one loaded retriever per collection and hot-swaps it when a new snapshot
+    is published.
+
+    A background thread watches the snapshot pointer of every loaded collection. When
+    it moves, the new snapshot is loaded and warmed up off the request path and then
+    swapped in.
+    Requests hold a lease on the snapshot they are using, so in-flight searches finish
+    on the retriever they started with and leased snapshots are never garbage collected.
+    A swapped-out retriever is released once its last lease ends, before its snapshot
+    becomes eligible for garbage collection.
+    """
+
+    def __init__(
+        self,
+        poll_interval: float = 5.0,
+        keep: int = 3,
+        gc_grace_seconds: float = 10 * 60,
+        on_swap: Optional[Callable[[str, Optional[str], str], None]] = None,
+    ):
+        """
+        Parameters:
+        - poll_interval: Seconds between checks for newly published snapshots
+        - keep: Number of most recent snapshots retained per collection
+        - gc_grace_seconds: Minimum time a superseded snapshot is kept, so other server
+                            processes can swap away from it and finish their requests
+        - on_swap: Optional callback invoked with the collection name, the previous
+                   version and the new snapshot id after each swap
+        """
+        self.poll_interval = poll_interval
+        self.keep = keep
+        self.gc_grace_seconds = gc_grace_seconds
+        self.on_swap = on_swap
+
+        self._retrievers: Dict[str, Tuple[Optional[str], Any]] = {}
+        self._leases = defaultdict(int)
+        self._retired: Dict[Tuple[str, Optional[str]], Any] = {}
+        self._lock = threading.Lock()
+        self._load_locks = defaultdict(threading.Lock)
+        self._stop_event = threading.Event()
+        self._watcher = None
+
+    def current_version(self, collection_name: str) -> Optional[str]:
+        """Return the version of the retriever currently serving a collection, or None if not loaded."""
+        with self._lock:
+            entry = self._retrievers.get(collection_name)
+        return entry[0] if entry is not None else None
+
+    @contextmanager
+    def acquire(self, collection_name: str, gallery_path: str) -> Iterator[Tuple[Optional[str], Any]]:
+        """
+        Lease the retriever currently serving a collection, loading or building it on first use.
+
+        Yields:
+        - The collection version and the retriever
+        """
+        with self._lock:
+            loaded = collection_name in self._retrievers
+        if not loaded:
+            self._load_initial(collection_name, gallery_path)
+
+        with self._lock:
+            version, retriever = self._retrievers[collection_name]
+            self._leases[(collection_name, version)] += 1
+        try:
+            yield version, retriever
+        finally:
+            with self._lock:
+                self._leases[(collection_name, version)] -= 1
+                if self._leases[(collection_name, version)] <= 0:
+                    del self._leases[(collection_name, version)]
+
+    def refresh(self) -> None:
+        """Swap in newly published snapshots and garbage collect unused ones."""
+        with self._lock:
+            loaded = dict(self._retrievers)
+
+        for collection_name, (version, _) in loaded.items():
+            snapshot_id = read_current_snapshot(collection_name)
+            if snapshot_id is not None and snapshot_id != version:
+                try:
+                    retriever = load_snapshot_retriever(collection_name, snapshot_id)
+                except Exception as e:
+                    # Keep serving the current retriever, the next poll retries
+                    print(f"Failed to load snapshot {snapshot_id} of '{collection_name}': {e}", file=sys.stderr)
+                    continue
+
+                # Load the vector index now rather than on the first request after the swap
+                try:
+                    warm_up_retriever(retriever)
+                except Exception as e:
+                    release_multi_vector_retriever(retriever)
+                    print(f"Failed to warm up snapshot {snapshot_id} of '{collection_name}': {e}", file=sys.stderr)
+                    continue
+
+                with self._lock:
+                    previous_version, previous_retriever = self._retrievers[collection_name]
+                    self._retired[(collection_name, previous_version)] = previous_retriever
+                    self._retrievers[collection_name] = (snapshot_id, retriever)
+                print(f"Swapped '{collection_name}' to snapshot {snapshot_id}", file=sys.stderr)
+
+                if self.on_swap is not None:
+                    try:
+                        self.on_swap(collection_name, previous_version, snapshot_id)
+                    except Exception as e:
+                        print(f"Swap callback failed for '{collection_name}': {e}", file=sys.stderr)
+
+            self._release_idle(collection_name)
+
+            with self._lock:
+                in_use = {v for (name, v), count in self._leases.items() if name == collection_name and count > 0}
+                in_use.update(v for (name, v) in self._retired if name == collection_name)
+                in_use.add(self._retrievers[collection_name][0])
+            in_use.discard(None)
+
+            removed = garbage_collect_snapshots(
+                collection_name,
+                keep=self.keep,
+                in_use=in_use,
+                superseded_grace_seconds=self.gc_grace_seconds,
+            )
+            if removed:
+                print(f"Removed old snapshots of '{collection_name}': {', '.join(removed)}", file=sys.stderr)
+
+    def stop(self) -> None:
+        """Stop watching for new snapshots."""
+        self._stop_event.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def _release_idle(self, collection_name: str) -> None:
+        """Release swapped-out retrievers of a collection that no request holds anymore."""
+        with self._lock:
+            idle = [
+                key for key in self._retired
+                if key[0] == collection_name and self._leases.get(key, 0) <= 0
+            ]
+            retrievers = [self._retired.pop(key) for key in idle]
+
+        for (_, version), retriever in zip(idle, retrievers):
+            try:
+                release_multi_vector_retriever(retriever)
+            except Exception as e:
+                print(f"Failed to release snapshot {version} of '{collection_name}': {e}", file=sys.stderr)
+
+    def _load_initial(self, collection_name: str, gallery_path: str) -> None:
+        # Serialize cold loads per collection so concurrent first requests build it only once
+        with self._load_locks[collection_name]:
+            with self._lock:
+                if collection_name in self._retrievers:
+                    return
+
+            snapshot_id = read_current_snapshot(collection_name)
+            flat_layout_version = get_flat_layout_version(collection_name)
+            if snapshot_id is not None:
+                retriever = load_snapshot_retriever(collection_name, snapshot_id)
+            elif flat_layout_version is not None:
+                # Retriever saved before snapshots were introduced. It is tagged with the version
+                # read before loading, so a snapshot published meanwhile is still swapped in by refresh.
+                retriever = load_flat_layout_retriever(collection_name)
+                snapshot_id = flat_layout_version
+            else:
+                # Old snapshots are garbage collected by refresh, which applies self.keep
+                snapshot_id, retriever = build_multi_vector_retriever_snapshot(gallery_path, collection_name)
+
+            with self._lock:
+                self._retrievers[collection_name] = (snapshot_id, retriever)
+
+        self._ensure_watcher()
+
+    def _ensure_watcher(self) -> None:
+        with self._lock:
+            if self._watcher is not None:
+                return
+            self._watcher = threading.Thread(target=self._watch, name="snapshot-watcher", daemon=True)
+            self._watcher.start()
+
+    def _watch(self) -> None:
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Snapshot refresh failed: {e}", file=sys.stderr)
@@ -0,0 +1,249 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from typing import Iterable, List, Optional
+
+MANIFEST_FILENAME = "MANIFEST.json"
+POINTER_FILENAME = "CURRENT"
+SNAPSHOTS_DIRNAME = "snapshots"
+TMP_PREFIX = ".tmp-"
+
+# Files written by save_multi_vector_retriever that must be present in every snapshot
+REQUIRED_FILES = ("config.json", "docstore.pkl")
+# Files whose contents never change after the snapshot is finalized. The vectorstore's
+# own files are only checked for presence, since opening them may touch them.
+SEALED_FILES = REQUIRED_FILES + ("vectorstore_info.json",)
+# Transient SQLite files that may come and go whenever the database is opened
+SQLITE_SIDECAR_SUFFIXES = ("-wal", "-shm", "-journal")
+
+
+def get_collection_dir(collection_name: str) -> str:
+    """Return the directory holding the snapshots and pointer of a collection."""
+    return os.path.join(os.getcwd(), "chroma_db", collection_name)
+
+
+def get_snapshots_dir(collection_name: str) -> str:
+    """Return the directory holding the snapshots of a collection."""
+    return os.path.join(get_collection_dir(collection_name), SNAPSHOTS_DIRNAME)
+
+
+def get_snapshot_dir(collection_name: str, snapshot_id: str) -> str:
+    """Return the directory of one snapshot."""
+    return os.path.join(get_snapshots_dir(collection_name), snapshot_id)
+
+
+def new_snapshot_id() -> str:
+    """Create a snapshot id. Ids sort in creation order."""
+    now = time.time()
+    return f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime(now))}.{int(now * 1e6) % 1000000:06d}-{uuid.uuid4().hex[:8]}"
+
+
+def create_staging_dir(collection_name: str, snapshot_id: str) -> str:
+    """Create the temporary directory a snapshot is built in before it is renamed into place."""
+    staging_dir = os.path.join(get_snapshots_dir(collection_name), TMP_PREFIX + snapshot_id)
+    os.makedirs(staging_dir)
+    return staging_dir
+
+
+def fsync_dir(path: str) -> None:
+    """Flush a directory entry so renames inside it survive a crash."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path: str, data: bytes) -> None:
+    """Write a file by writing a temporary file, fsyncing it and renaming it over the target."""
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=TMP_PREFIX)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    fsync_dir(directory)
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _list_files(root: str) -> List[str]:
+    files = []
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            rel_path = os.path.relpath(os.path.join(dirpath, filename), root)
+            if rel_path != MANIFEST_FILENAME and not filename.endswith(SQLITE_SIDECAR_SUFFIXES):
+                files.append(rel_path)
+    return sorted(files)
+
+
+def finalize_snapshot(collection_name: str, snapshot_id: str, staging_dir: str) -> str:
+    """
+    Seal a staged snapshot and move it to its final location.
+
+    Every file is fsynced, a manifest listing the files (with sizes and checksums for
+    the sealed ones) is written last and the staging directory is renamed to the
+    snapshot directory. The snapshot is not served until publish_snapshot points the
+    collection at it.
+
+    Returns:
+    - The final snapshot directory
+    """
+    manifest = {"snapshot_id": snapshot_id, "created_at": time.time(), "files": {}}
+    for rel_path in _list_files(staging_dir):
+        path = os.path.join(staging_dir, rel_path)
+        with open(path, 'rb') as f:
+            os.fsync(f.fileno())
+        if rel_path in SEALED_FILES:
+            manifest["files"][rel_path] = {"size": os.path.getsize(path), "sha256": _sha256(path)}
+        else:
+            manifest["files"][rel_path] = {}
+
+    for dirpath, _, _ in os.walk(staging_dir):
+        fsync_dir(dirpath)
+    atomic_write(os.path.join(staging_dir, MANIFEST_FILENAME), json.dumps(manifest, indent=2).encode("utf-8"))
+
+    snapshot_dir = get_snapshot_dir(collection_name, snapshot_id)
+    os.rename(staging_dir, snapshot_dir)
+    fsync_dir(get_snapshots_dir(collection_name))
+    return snapshot_dir
+
+
+def validate_snapshot(snapshot_dir: str, verify_checksums: bool = False) -> dict:
+    """
+    Check that a snapshot is complete.
+
+    Parameters:
+    - snapshot_dir: Directory of the snapshot
+    - verify_checksums: Also compare file contents against the manifest checksums
+
+    Returns:
+    - The snapshot manifest
+
+    Raises:
+    - ValueError if the snapshot is incomplete or corrupted
+    """
+    manifest_path = os.path.join(snapshot_dir, MANIFEST_FILENAME)
+    try:
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ValueError(f"Snapshot {snapshot_dir} has no readable manifest: {e}")
+
+    files = manifest.get("files", {})
+    for required in REQUIRED_FILES:
+        if required not in files:
+            raise ValueError(f"Snapshot {snapshot_dir} is missing {required}")
+
+    for rel_path, info in files.items():
+        path = os.path.join(snapshot_dir, rel_path)
+        if not os.path.isfile(path):
+            raise ValueError(f"Snapshot {snapshot_dir} is missing {rel_path}")
+        if "size" in info and os.path.getsize(path) != info["size"]:
+            raise ValueError(f"Snapshot {snapshot_dir} has a truncated {rel_path}")
+        if verify_checksums and "sha256" in info and _sha256(path) != info["sha256"]:
+            raise ValueError(f"Snapshot {snapshot_dir} has a corrupted {rel_path}")
+
+    return manifest
+
+
+def read_current_snapshot(collection_name: str) -> Optional[str]:
+    """Return the id of the snapshot a collection currently points to, or None."""
+    pointer_path = os.path.join(get_collection_dir(collection_name), POINTER_FILENAME)
+    try:
+        with open(pointer_path, 'r') as f:
+            snapshot_id = f.read().strip()
+    except OSError:
+        return None
+    return snapshot_id or None
+
+
+def publish_snapshot(collection_name: str, snapshot_id: str) -> None:
+    """Validate a snapshot and atomically point the collection at it."""
+    validate_snapshot(get_snapshot_dir(collection_name, snapshot_id), verify_checksums=True)
+    pointer_path = os.path.join(get_collection_dir(collection_name), POINTER_FILENAME)
+    atomic_write(pointer_path, snapshot_id.encode("utf-8"))
+
+
+def list_snapshots(collection_name: str) -> List[str]:
+    """Return the ids of the finalized snapshots of a collection, oldest first."""
+    snapshots_dir = get_snapshots_dir(collection_name)
+    if not os.path.isdir(snapshots_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(snapshots_dir)
+        if not name.startswith(TMP_PREFIX) and os.path.isdir(os.path.join(snapshots_dir, name))
+    )
+
+
+def _created_at(snapshot_dir: str) -> float:
+    """Return when a snapshot was finalized, falling back to its directory mtime."""
+    try:
+        with open(os.path.join(snapshot_dir, MANIFEST_FILENAME), 'r') as f:
+            return float(json.load(f)["created_at"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return os.path.getmtime(snapshot_dir)
+
+
+def garbage_collect_snapshots(
+    collection_name: str,
+    keep: int = 3,
+    in_use: Iterable[str] = (),
+    staging_grace_seconds: float = 24 * 60 * 60,
+    superseded_grace_seconds: float = 10 * 60,
+) -> List[str]:
+    """
+    Delete old snapshots of a collection.
+
+    The current snapshot, the `keep` most recent snapshots and any snapshot listed in
+    `in_use` are kept. `in_use` only covers the calling process, so a snapshot is also
+    kept until it was superseded more than `superseded_grace_seconds` ago, giving other
+    processes time to swap away from it and finish their requests. Abandoned staging
+    directories older than `staging_grace_seconds` are deleted as well.
+
+    Returns:
+    - The names of the deleted directories
+    """
+    snapshots_dir = get_snapshots_dir(collection_name)
+    if not os.path.isdir(snapshots_dir):
+        return []
+
+    protected = set(in_use)
+    current = read_current_snapshot(collection_name)
+    if current is not None:
+        protected.add(current)
+
+    snapshots = list_snapshots(collection_name)
+    if keep > 0:
+        protected.update(snapshots[-keep:])
+    now = time.time()
+    removable = []
+    for snapshot_id, successor_id in zip(snapshots, snapshots[1:]):
+        superseded_at = _created_at(get_snapshot_dir(collection_name, successor_id))
+        if snapshot_id not in protected and now - superseded_at > superseded_grace_seconds:
+            removable.append(snapshot_id)
+
+    for name in os.listdir(snapshots_dir):
+        path = os.path.join(snapshots_dir, name)
+        if name.startswith(TMP_PREFIX) and now - os.path.getmtime(path) > staging_grace_seconds:
+            removable.append(name)
+
+    for name in removable:
+        shutil.rmtree(os.path.join(snapshots_dir, name), ignore_errors=True)
+    return removable
@@ -17,20 +17,36 @@ def save_base64_image(base64_string, output_path):
     # Save the image to the specified output path
     image.save(output_path, 'JPEG')
 
-def save_images_from_results(results):
-    """Save the base64 images from the results list to the outputs folder."""
+def encode_result_images(results):
+    """Decodes the base64 images from the results list into JPEG file contents."""
+    images = []
+    for base64_string in results:
+        buffer = BytesIO()
+        Image.open(BytesIO(base64.b64decode(base64_string))).save(buffer, 'JPEG')
+        images.append(buffer.getvalue())
+    return images
+
+
+def write_result_images(images):
+    """Write JPEG file contents produced by encode_result_images to the outputs folder."""
     # Ensure the outputs directory exists
     os.makedirs('outputs', exist_ok=True)
 
-    for index, base64_string in enumerate(results):
+    for index, image_bytes in enumerate(images):
         # Create the output file path with the correct name
         output_path = os.path.join('outputs', f'result_image_{index}.jpg')
 
         # Save the image
-        save_base64_image(base64_string, output_path)
+        with open(output_path, 'wb') as f:
+            f.write(image_bytes)
         print(f"Saved image {output_path}")
 
 
+def save_images_from_results(results):
+    """Save the base64 images from the results list to the outputs folder."""
+    write_result_images(encode_result_images(results))
+
+
 def print_retriever_contents(retriever):
     """
     Prints the image summaries and text documents stored in the retriever's vectorstore
@@ -0,0 +1,89 @@
+import glob
+import os
+
+from multimodal_search.cache import SearchResultCache
+
+
+class FakeEmbeddings:
+    def embed_query(self, query):
+        return [1.0, 0.0] if "dog" in query else [0.0, 1.0]
+
+
+def test_hit_after_put_with_normalized_query():
+    cache = SearchResultCache()
+    cache.put("Dogs ", "col", "v1", [b"img"])
+
+    assert cache.get("  dogs", "col", "v1") == [b"img"]
+    assert cache.get("dogs", "col", "v2") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_other_version_does_not_evict_entries(tmp_path):
+    cache = SearchResultCache(cache_dir=str(tmp_path))
+    cache.put("dogs", "col", "v2", [b"a"])
+    cache.put("cats", "col", "v1", [b"b"])
+
+    assert cache.get("dogs", "col", "v2") == [b"a"]
+    assert os.path.isdir(tmp_path / "col" / "v2")
+
+
+def test_similarity_hit():
+    cache = SearchResultCache(similarity_threshold=0.99, embedding_function=FakeEmbeddings())
+    cache.put("dogs", "col", "v1", [b"img"])
+
+    assert cache.get("dog pictures", "col", "v1") == [b"img"]
+    assert cache.get("cats", "col", "v1") is None
+    assert cache.stats()["similarity_hits"] == 1
+
+
+def test_memory_limited_by_bytes():
+    cache = SearchResultCache(max_bytes=250)
+    for i in range(5):
+        cache.put(f"q{i}", "col", "v1", [b"x" * 100])
+
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["bytes"] == 200
+    assert cache.get("q4", "col", "v1") is not None
+    assert cache.get("q0", "col", "v1") is None
+
+
+def test_disk_tier_shared_between_instances(tmp_path):
+    SearchResultCache(cache_dir=str(tmp_path)).put("dogs", "col", "v1", [b"\xff\xd8", "text"])
+
+    cache = SearchResultCache(cache_dir=str(tmp_path))
+    assert cache.get("dogs", "col", "v1") == [b"\xff\xd8", "text"]
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_corrupted_disk_entry_is_a_miss(tmp_path):
+    SearchResultCache(cache_dir=str(tmp_path)).put("dogs", "col", "v1", [b"img"])
+    for path in glob.glob(str(tmp_path / "col" / "v1" / "*.json")):
+        with open(path, "w") as f:
+            f.write('{"results": 5}')
+
+    assert SearchResultCache(cache_dir=str(tmp_path)).get("dogs", "col", "v1") is None
+
+
+def test_disk_tier_limited_by_bytes(tmp_path):
+    cache = SearchResultCache(cache_dir=str(tmp_path), max_disk_bytes=300)
+    for i in range(10):
+        cache.put(f"q{i}", "col", "v1", [b"x" * 50])
+
+    files = glob.glob(str(tmp_path / "col" / "v1" / "*.json"))
+    assert sum(os.path.getsize(path) for path in files) <= 300
+
+
+def test_prune_versions(tmp_path):
+    cache = SearchResultCache(cache_dir=str(tmp_path))
+    cache.put("dogs", "col", "v1", [b"a"])
+    cache.put("dogs", "col", "v2", [b"b"])
+    cache.put("dogs", "other", "v1", [b"c"])
+
+    cache.prune_versions("col", keep_versions=["v2"])
+
+    assert os.listdir(tmp_path / "col") == ["v2"]
+    assert cache.get("dogs", "col", "v1") is None
+    assert cache.get("dogs", "col", "v2") == [b"b"]
+    assert cache.get("dogs", "other", "v1") == [b"c"]
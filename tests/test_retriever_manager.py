@@ -0,0 +1,105 @@
+import os
+
+import pytest
+
+# RetrieverManager imports the langchain/chromadb stack through chroma_db
+pytest.importorskip("multimodal_search.chroma_db")
+
+from multimodal_search import retriever_manager as manager_module
+from multimodal_search.retriever_manager import RetrieverManager
+from multimodal_search.snapshots import (
+    create_staging_dir,
+    finalize_snapshot,
+    get_snapshots_dir,
+    list_snapshots,
+    new_snapshot_id,
+    publish_snapshot,
+)
+
+
+class FakeRetriever:
+    def __init__(self, snapshot_id):
+        self.snapshot_id = snapshot_id
+
+
+@pytest.fixture
+def released(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(get_snapshots_dir("col"))
+
+    released = []
+    monkeypatch.setattr(manager_module, "load_snapshot_retriever", lambda name, snapshot_id: FakeRetriever(snapshot_id))
+    monkeypatch.setattr(manager_module, "warm_up_retriever", lambda retriever: None)
+    monkeypatch.setattr(manager_module, "release_multi_vector_retriever", released.append)
+    return released
+
+
+@pytest.fixture
+def manager():
+    manager = RetrieverManager(poll_interval=3600, keep=1, gc_grace_seconds=0)
+    yield manager
+    manager.stop()
+
+
+def publish_new_snapshot():
+    snapshot_id = new_snapshot_id()
+    staging_dir = create_staging_dir("col", snapshot_id)
+    for filename in ("config.json", "docstore.pkl"):
+        with open(os.path.join(staging_dir, filename), "w") as f:
+            f.write("data")
+    finalize_snapshot("col", snapshot_id, staging_dir)
+    publish_snapshot("col", snapshot_id)
+    return snapshot_id
+
+
+def test_leased_snapshot_is_released_and_collected_after_lease_ends(released, manager):
+    first = publish_new_snapshot()
+
+    with manager.acquire("col", "gallery") as (version, retriever):
+        assert version == first
+
+        second = publish_new_snapshot()
+        manager.refresh()
+
+        # New requests are served by the new snapshot, the in-flight one keeps the old
+        assert manager.current_version("col") == second
+        assert retriever.snapshot_id == first
+        assert released == []
+        assert first in list_snapshots("col")
+
+    manager.refresh()
+
+    assert [r.snapshot_id for r in released] == [first]
+    assert list_snapshots("col") == [second]
+
+
+def test_failed_warm_up_keeps_current_snapshot(released, manager, monkeypatch):
+    first = publish_new_snapshot()
+    with manager.acquire("col", "gallery"):
+        pass
+
+    def fail(retriever):
+        raise RuntimeError("index unavailable")
+
+    monkeypatch.setattr(manager_module, "warm_up_retriever", fail)
+    second = publish_new_snapshot()
+    manager.refresh()
+
+    assert manager.current_version("col") == first
+    assert [r.snapshot_id for r in released] == [second]
+    assert second in list_snapshots("col")
+
+
+def test_on_swap_called_with_versions(released, monkeypatch):
+    swaps = []
+    manager = RetrieverManager(poll_interval=3600, on_swap=lambda *args: swaps.append(args))
+    try:
+        first = publish_new_snapshot()
+        with manager.acquire("col", "gallery"):
+            pass
+        second = publish_new_snapshot()
+        manager.refresh()
+    finally:
+        manager.stop()
+
+    assert swaps == [("col", first, second)]
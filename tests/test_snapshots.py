@@ -0,0 +1,139 @@
+import json
+import os
+import time
+
+import pytest
+
+from multimodal_search.snapshots import (
+    MANIFEST_FILENAME,
+    create_staging_dir,
+    finalize_snapshot,
+    garbage_collect_snapshots,
+    get_snapshot_dir,
+    get_snapshots_dir,
+    list_snapshots,
+    new_snapshot_id,
+    publish_snapshot,
+    read_current_snapshot,
+    validate_snapshot,
+)
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    # Collections live under ./chroma_db
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(get_snapshots_dir("col"))
+    return tmp_path
+
+
+def make_snapshot(collection_name="col", publish=True, created_at=None):
+    snapshot_id = new_snapshot_id()
+    staging_dir = create_staging_dir(collection_name, snapshot_id)
+    for filename in ("config.json", "docstore.pkl", "chroma.sqlite3", "chroma.sqlite3-journal"):
+        with open(os.path.join(staging_dir, filename), "w") as f:
+            f.write("data")
+    snapshot_dir = finalize_snapshot(collection_name, snapshot_id, staging_dir)
+
+    if created_at is not None:
+        manifest_path = os.path.join(snapshot_dir, MANIFEST_FILENAME)
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        manifest["created_at"] = created_at
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f)
+
+    if publish:
+        publish_snapshot(collection_name, snapshot_id)
+    return snapshot_id
+
+
+def test_finalize_and_publish():
+    snapshot_id = make_snapshot()
+
+    assert read_current_snapshot("col") == snapshot_id
+    assert list_snapshots("col") == [snapshot_id]
+    manifest = validate_snapshot(get_snapshot_dir("col", snapshot_id), verify_checksums=True)
+    assert "chroma.sqlite3" in manifest["files"]
+    assert "chroma.sqlite3-journal" not in manifest["files"]
+
+
+def test_unpublished_snapshot_is_not_current():
+    make_snapshot(publish=False)
+
+    assert read_current_snapshot("col") is None
+
+
+def test_validate_rejects_truncated_file():
+    snapshot_dir = get_snapshot_dir("col", make_snapshot())
+    with open(os.path.join(snapshot_dir, "docstore.pkl"), "w") as f:
+        f.write("d")
+
+    with pytest.raises(ValueError, match="truncated docstore.pkl"):
+        validate_snapshot(snapshot_dir)
+
+
+def test_validate_rejects_missing_manifest():
+    snapshot_dir = get_snapshot_dir("col", make_snapshot())
+    os.remove(os.path.join(snapshot_dir, MANIFEST_FILENAME))
+
+    with pytest.raises(ValueError, match="no readable manifest"):
+        validate_snapshot(snapshot_dir)
+
+
+def test_validate_ignores_removed_sqlite_sidecar():
+    snapshot_dir = get_snapshot_dir("col", make_snapshot())
+    os.remove(os.path.join(snapshot_dir, "chroma.sqlite3-journal"))
+
+    validate_snapshot(snapshot_dir)
+
+
+def test_publish_rejects_corrupted_snapshot():
+    snapshot_id = make_snapshot(publish=False)
+    with open(os.path.join(get_snapshot_dir("col", snapshot_id), "config.json"), "w") as f:
+        f.write("xxxx")
+
+    with pytest.raises(ValueError, match="corrupted config.json"):
+        publish_snapshot("col", snapshot_id)
+    assert read_current_snapshot("col") is None
+
+
+def test_gc_keeps_recently_superseded_snapshots():
+    ids = [make_snapshot() for _ in range(3)]
+
+    assert garbage_collect_snapshots("col", keep=1) == []
+    assert list_snapshots("col") == ids
+
+
+def test_gc_removes_snapshots_superseded_past_grace():
+    old = time.time() - 3600
+    ids = [make_snapshot(created_at=old) for _ in range(3)]
+    current = make_snapshot()
+
+    removed = garbage_collect_snapshots("col", keep=1, in_use=[ids[1]], superseded_grace_seconds=60)
+
+    assert removed == [ids[0]]
+    assert list_snapshots("col") == [ids[1], ids[2], current]
+
+
+def test_gc_never_removes_current_snapshot():
+    ids = [make_snapshot() for _ in range(3)]
+    publish_snapshot("col", ids[0])
+
+    garbage_collect_snapshots("col", keep=0, superseded_grace_seconds=0)
+
+    # The newest snapshot has not been superseded, so it is kept as well
+    assert list_snapshots("col") == [ids[0], ids[2]]
+
+
+def test_gc_removes_stale_staging_directories():
+    stale = create_staging_dir("col", new_snapshot_id())
+    fresh = create_staging_dir("col", new_snapshot_id())
+    old = time.time() - 3600
+    os.utime(stale, (old, old))
+
+    removed = garbage_collect_snapshots("col", staging_grace_seconds=60)
+
+    assert removed == [os.path.basename(stale)]
+    assert not os.path.exists(stale)
+    assert os.path.exists(fresh)